@@ -10,8 +10,6 @@ import subprocess
 from pathlib import Path
 from typing import Any, Iterable, List
 
-# NOTE: basic loads EXPECTED_RESULTS from a file so this whole script will fail
-# if expected_results.json doesn't already exist
 from test_framework import basic, regalloc
 from test_framework.basic import ROOT_DIR, TEST_DIR
 
@@ -1,25 +1,57 @@
 """Basic tests for Parts I & II"""
 from __future__ import annotations
 
+import functools
+import hashlib
 import json
+import operator
+import os
 import platform
 import subprocess
-import sys
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from enum import Flag, auto, unique
 from pathlib import Path
-from typing import Any, Callable, List, Optional, Sequence, Type
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Type,
+)
 
 # Constants + per-test info from configuration files
 # TODO should this be in a separate module maybe?
 
 ROOT_DIR = Path(__file__).parent.parent  # ROOT of test repo
 TEST_DIR = ROOT_DIR / "tests"  # directory containing all test programs
+# resolve TEST_DIR once here instead of resolving each chapter's directory separately
+# (chapter directories themselves are never symlinks)
+_TEST_DIR_RESOLVED = TEST_DIR.resolve()
 IS_OSX = platform.system().lower() == "darwin"
+
+
+# EXPECTED_RESULTS is loaded on first access (see __getattr__ below), since test runs
+# that don't execute any programs (e.g. with --stage) never need it
 EXPECTED_RESULTS: dict[str, Any]
 
-with open(ROOT_DIR / "expected_results.json", "r", encoding="utf-8") as f:
-    EXPECTED_RESULTS = json.load(f)
+
+@functools.lru_cache(maxsize=None)
+def _expected_results() -> dict[str, Any]:
+    with open(ROOT_DIR / "expected_results.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def __getattr__(name: str) -> Any:
+    """Load configuration that not every test run needs on first access (PEP 562)"""
+    if name == "EXPECTED_RESULTS":
+        return _expected_results()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 EXTRA_CREDIT_PROGRAMS: dict[str, list[str]]
 REQUIRES_MATHLIB: list[str]
@@ -30,9 +62,15 @@ with open(ROOT_DIR / "test_properties.json", "r", encoding="utf-8") as f:
     EXTRA_CREDIT_PROGRAMS = test_info["extra_credit_tests"]
     REQUIRES_MATHLIB = test_info["requires_mathlib"]
     ASSEMBLY_DEPENDENCIES = test_info["assembly_libs"]
-ASSEMBLY_LIBS = set(
-    lib for libs in ASSEMBLY_DEPENDENCIES.values() for lib in libs.values()
-)
+# suffixes of files the compiler under test may produce from foo.c: preprocessed
+# source, assembly, object file, and executable
+OUTPUT_SUFFIXES = (".i", ".s", ".o", "")
+# where we record tests that passed, so we can skip them next time (see --cache option);
+# set TEST_CACHE_DIR to keep them somewhere else
+RESULT_CACHE_DIR = Path(os.environ.get("TEST_CACHE_DIR", ROOT_DIR / ".test_cache"))
+# delete cache entries that no test run has used for this long (in seconds);
+# rebuilding the compiler under test orphans all of its old entries
+RESULT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
 
 # main TestChapter class + related utilities
 
@@ -44,8 +82,13 @@ def get_platform() -> str:
         return "linux"
 
 
+@functools.lru_cache(maxsize=None)
 def get_props_key(source_file: Path) -> str:
-    """key to use in EXPECTED_RESULTS, REQUIRES_MATHLIB, EXTRA_CREDIT_PROGRAMS"""
+    """key to use in EXPECTED_RESULTS, REQUIRES_MATHLIB, EXTRA_CREDIT_PROGRAMS
+
+    Memoized, since we look up the same program's key while building test classes
+    and again while running its test.
+    """
     return str(source_file.relative_to(TEST_DIR))
 
 
@@ -58,34 +101,26 @@ def print_stderr(proc: subprocess.CompletedProcess[str]) -> None:
     if proc.stderr:
         print(proc.stderr)
 
-def gcc_build_obj(prog: Path) -> None:
-    """Use the 'gcc' command to compile source file to an object file.
-    This is used to test ABI compatibility between our compiler and the system compiler
+
+def _run_process(
+    args: Sequence[Any], capture_output: bool
+) -> subprocess.CompletedProcess[Any]:
+    """Run a command and wait for it to finish.
+
+    If capture_output is true, capture its stdout and stderr as str. Otherwise, send
+    them to /dev/null; not setting up (and draining) pipes makes each spawn cheaper.
     """
-    objfile = prog.with_suffix(".o")
-
-    # IMPORTANT: if we're building a library, and 'gcc' command actually
-    # points to clang, which it does on macOS, we must _not_ enable optimizations
-    # Clang optimizes out sign-/zero-extension for narrow args
-    # which violates the System V ABI and breaks ABI compatibility
-    # with our implementation
-    # see https://stackoverflow.com/a/36760539
-    try:
-        subprocess.run(
-            [
-                "gcc",
-                prog,
-                "-c",
-                "-fstack-protector-all",
-                "-D",
-                "SUPPRESS_WARNINGS",
-                "-o",
-                objfile,
-            ],
-            check=True,
-        )
-    except subprocess.CalledProcessError as err:
-        raise RuntimeError(err.stderr) from err
+    if capture_output:
+        return subprocess.run(args, capture_output=True, check=False, text=True)
+    return subprocess.run(
+        args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+    )
+
+
+# command and options to build test programs with the system compiler;
+# -pipe passes intermediate output between compilation stages through pipes
+# instead of temporary files
+_GCC_PREFIX = ("gcc", "-pipe", "-D", "SUPPRESS_WARNINGS")
 
 
 def gcc_compile_and_run(
@@ -107,10 +142,13 @@ def gcc_compile_and_run(
     # compile it
     try:
         result = subprocess.run(
-            ["gcc", "-D", "SUPPRESS_WARNINGS"] + source_files + options + ["-o", exe],
+            (*_GCC_PREFIX, *source_files, *options, "-o", exe),
             check=True,
             text=True,
-            capture_output=False,
+            # gcc doesn't write anything useful to stdout;
+            # capture stderr so we can report warnings and errors
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
         )
         # print any warnings even if it succeeded
         print_stderr(result)
@@ -119,18 +157,110 @@ def gcc_compile_and_run(
         # TODO better handling of internal problems with test suite
         raise RuntimeError(err.stderr) from err
 
-
     # run it
     return subprocess.run([exe], check=False, text=True, capture_output=True)
 
 
 def replace_stem(path: Path, new_stem: str) -> Path:
     """Return a new path with the stem changed and suffix the same"""
-    if sys.version_info >= (3, 9):
-        return path.with_stem(new_stem)
+    # equivalent to path.with_stem(new_stem), which isn't available in 3.8
+    return path.with_name(new_stem + path.suffix)
+
+
+def walk_files(root: Path) -> Iterator[os.DirEntry[str]]:
+    """Yield the directory entry for every file under root (recursively).
+
+    Unlike Path.rglob, os.scandir gives us each entry's name and type without an extra
+    stat call. Like rglob, this yields nothing if root doesn't exist.
+    """
+    if not root.is_dir():
+        return
+    stack = [os.fspath(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry
+
+
+@functools.lru_cache(maxsize=None)
+def list_c_files(directory: Path) -> tuple[Path, ...]:
+    """Return every C file under directory (recursively).
+
+    Equivalent to directory.rglob("*.c"), but we can check the suffix without fnmatch.
+    Memoized per directory, so each test tree is only walked once per session.
+    """
+    return tuple(
+        Path(entry.path) for entry in walk_files(directory) if entry.name.endswith(".c")
+    )
+
+
+def output_files(source_file: Path) -> Iterator[Path]:
+    """Yield the paths of all files the compiler under test might produce from source_file.
+
+    gcc_compile_and_run also names its executable after its first input file, so this
+    covers the executables we build from the compiler's object and assembly files too.
+    """
+    for suffix in OUTPUT_SUFFIXES:
+        if suffix != source_file.suffix:
+            yield source_file.with_suffix(suffix)
+
+
+@functools.lru_cache(maxsize=None)
+def _header_mtimes(directory: Path) -> tuple[tuple[str, int], ...]:
+    """Return the name and mtime of every header file in directory.
+
+    Memoized, since headers don't change during a test run.
+    """
+    with os.scandir(directory) as entries:
+        return tuple(
+            sorted(
+                (entry.name, entry.stat().st_mtime_ns)
+                for entry in entries
+                if entry.name.endswith(".h")
+            )
+        )
+
 
-    # workaround for 3.8: stick old suffix on new stem
-    return path.with_name(new_stem).with_suffix(path.suffix)
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _record_pass(cache_path: Path, result: subprocess.CompletedProcess[str]) -> None:
+    """Record the results of a passing test in the result cache (see --cache option)"""
+    # write to a temporary file first so concurrent test runs never see a partial entry
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        RESULT_CACHE_DIR.mkdir(exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"return_code": result.returncode, "stdout_sha1": _sha1(result.stdout)},
+                f,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # e.g. read-only checkout; we'll just rerun this test next time
+        pass
+
+
+def prune_result_cache() -> None:
+    """Delete result cache entries that haven't been used recently (see --cache option)"""
+    cutoff = time.time() - RESULT_CACHE_MAX_AGE
+    try:
+        with os.scandir(RESULT_CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+    except OSError:
+        # no cache yet, read-only checkout, or another run pruned it first
+        pass
+
+
+def count_c_files(directory: Path) -> int:
+    """Count the C files under directory (recursively), reusing list_c_files' cached walk"""
+    return len(list_c_files(directory))
 
 
 class TestChapter(unittest.TestCase):
@@ -172,22 +302,63 @@ class TestChapter(unittest.TestCase):
     # last stage of the compiler we're testing; None if we're testing the whole thing
     exit_stage: str
 
+    # if true, skip compile_and_run tests that already passed with the same compiler,
+    # options, and test program, and record the ones that pass now
+    use_result_cache: bool = False
+
+    # invalid test programs whose compilation setUpClass should batch up
+    # (empty if we're not batching them)
+    batched_invalid_programs: Sequence[Path] = ()
+
+    # results of compiling batched_invalid_programs, consumed by compile_failure
+    # (empty until setUpClass runs)
+    _batched_results: Dict[Path, subprocess.CompletedProcess[Any]] = {}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Compile all the invalid test programs up front, in parallel.
+
+        compile_failure only looks at the exit code and checks that there are no output
+        files, so it doesn't need to run the compiler itself; it can use these results.
+        """
+        cls._batched_results = {}
+        if not cls.batched_invalid_programs:
+            return
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {
+                # compile_failure only looks at the exit code, so discard output
+                prog: executor.submit(cls._run_compiler, prog, None, False)
+                for prog in cls.batched_invalid_programs
+            }
+        for prog, future in futures.items():
+            # if something went wrong (e.g. the compiler doesn't exist), leave it to
+            # compile_failure to hit the same problem and report it
+            if future.exception() is None:
+                cls._batched_results[prog] = future.result()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Clean up after batched compilations whose tests didn't run"""
+        for prog in cls._batched_results:
+            for output in output_files(prog):
+                output.unlink(missing_ok=True)
+
+    def setUp(self) -> None:
+        """Start tracking the files this test produces"""
+        # paths of any files the compiler under test might produce during this test
+        self._artifacts: List[Path] = []
+
     def tearDown(self) -> None:
         """Delete files produced during this test run (e.g. assembly and object files)"""
-        garbage_files = (
-            f
-            for f in self.test_dir.rglob("*")
-            if not f.is_dir()
-            and f.suffix not in [".c", ".h"]
-            and f.name not in ASSEMBLY_LIBS
-        )
-
-        for junk in garbage_files:
-            junk.unlink()
+        for artifact in self._artifacts:
+            artifact.unlink(missing_ok=True)
 
     def invoke_compiler(
-        self, source_file: Path, cc_opt: Optional[str] = None
-    ) -> subprocess.CompletedProcess[str]:
+        self,
+        source_file: Path,
+        cc_opt: Optional[str] = None,
+        capture_output: bool = True,
+    ) -> subprocess.CompletedProcess[Any]:
         """Compile the test program (possibly up to some intermediate stage), but don't run it.
 
         Args:
@@ -196,41 +367,55 @@ class TestChapter(unittest.TestCase):
                 (in addition to exit stage and anything specified in self.options).
                 Used to compile without linking (for library tests);
                 to link math library; and to compile to assembly (for optimization tests)
+            capture_output (optional): Whether to capture the compiler's stdout and stderr.
+                Pass False if the caller only needs the exit code.
 
         Returns:
             A CompletedObject the captures the result of compilation (including an exit code
             indicating whether it succeeded and any error messages produced by the compiler)
         """
-        if cc_opt is None and self.exit_stage is not None:
-            cc_opt = f"--{self.exit_stage}"
-
-        args = [self.cc] + self.options
+        # remember everything this might produce so tearDown can clean it up
+        self._artifacts.extend(output_files(source_file))
+        return self._run_compiler(source_file, cc_opt, capture_output)
+
+    @classmethod
+    def _run_compiler(
+        cls,
+        source_file: Path,
+        cc_opt: Optional[str] = None,
+        capture_output: bool = True,
+    ) -> subprocess.CompletedProcess[Any]:
+        """Run the compiler under test; see invoke_compiler"""
+        if cc_opt is None and cls.exit_stage is not None:
+            cc_opt = f"--{cls.exit_stage}"
+
+        args = [cls.cc] + cls.options
         if cc_opt is not None:
             args.append(cc_opt)
 
         args.append(source_file)
 
         # run the command: '{self.cc} {options} {source_file}'
-        proc = subprocess.run(args, capture_output=True, check=False, text=True)
-
-        return proc
+        return _run_process(args, capture_output)
 
     def validate_no_output(self, source_file: Path) -> None:
         """Make sure the compiler under test didn't emit executable or assembly code.
 
         Used when compiling invalid test cases or testing intermediate stages."""
 
+        # use plain string paths here; this runs for every invalid program and
+        # building Path objects costs more than the stat calls themselves
+        executable_file = os.path.splitext(source_file)[0]
+
         # if we compiled /path/to/foo.c, look for /path/to/foo.s
-        stem = source_file.stem
-        assembly_file = source_file.parent / f"{stem}.s"
+        assembly_file = executable_file + ".s"
         self.assertFalse(
-            assembly_file.exists(),
+            os.path.exists(assembly_file),
             msg=f"Found assembly file {assembly_file} for invalid program!",
         )
 
         # now look for /path/to/foo
-        executable_file = source_file.parent / stem
-        self.assertFalse(executable_file.exists())
+        self.assertFalse(os.path.exists(executable_file))
 
     def validate_runs(
         self, source_file: Path, actual: subprocess.CompletedProcess[str]
@@ -244,7 +429,7 @@ class TestChapter(unittest.TestCase):
             actual: result of compiling this source file with self.cc and running it
         """
         key = get_props_key(source_file)
-        expected = EXPECTED_RESULTS[key]
+        expected = _expected_results()[key]
         expected_retcode = expected["return_code"]
         expected_stdout = expected.get("stdout", "")
 
@@ -276,7 +461,13 @@ class TestChapter(unittest.TestCase):
         with self.assertRaises(
             subprocess.CalledProcessError, msg=f"Didn't catch error in {source_file}"
         ):
-            result = self.invoke_compiler(source_file)
+            result = self._batched_results.pop(source_file, None)
+            if result is None:
+                # we only need the exit code, so don't bother capturing output
+                result = self.invoke_compiler(source_file, capture_output=False)
+            else:
+                # already compiled in setUpClass; we still need to clean up after it
+                self._artifacts.extend(output_files(source_file))
             result.check_returncode()  # raise CalledProcessError if return code is non-zero
 
         self.validate_no_output(source_file)
@@ -307,6 +498,11 @@ class TestChapter(unittest.TestCase):
         else:
             cc_opt = None
 
+        if self.use_result_cache:
+            cache_path = self.result_cache_path(source_file)
+            if self.is_cached_pass(cache_path, source_file):
+                self.skipTest("cached pass")
+
         # run compiler, make sure it succeeds
         compile_result = self.invoke_compiler(source_file, cc_opt=cc_opt)
         self.assertEqual(
@@ -326,6 +522,52 @@ class TestChapter(unittest.TestCase):
 
         self.validate_runs(source_file, result)
 
+        # if we got this far, the test passed
+        if self.use_result_cache:
+            _record_pass(cache_path, result)
+
+    def result_cache_path(self, source_file: Path) -> Path:
+        """Return the path of the cache entry for a compile_and_run test.
+
+        The entry's name is a hash of everything that could change the test's result:
+        the compiler under test and its options, the test program, and any headers
+        next to it. We identify files by path and mtime, not by hashing their contents.
+        """
+        signature = [
+            str(self.cc),
+            self.cc.stat().st_mtime_ns,
+            list(self.options),
+            str(source_file),
+            source_file.stat().st_mtime_ns,
+            _header_mtimes(source_file.parent),
+        ]
+        return RESULT_CACHE_DIR / f"{_sha1(json.dumps(signature))}.json"
+
+    def is_cached_pass(self, cache_path: Path, source_file: Path) -> bool:
+        """Did a previous run with the same cache entry produce the expected results?
+
+        We compare the recorded results against EXPECTED_RESULTS again (instead of just
+        checking whether the entry exists) in case the expected results have changed.
+        If they match, we touch the entry so prune_result_cache won't delete it.
+        """
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            # no previous run, or a corrupted cache entry
+            return False
+        expected = _expected_results()[get_props_key(source_file)]
+        if cached != {
+            "return_code": expected["return_code"],
+            "stdout_sha1": _sha1(expected.get("stdout", "")),
+        }:
+            return False
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return True
+
     def library_test_helper(
         self, file_under_test: Path, other_file: Path, results_key: Path
     ) -> None:
@@ -354,12 +596,18 @@ class TestChapter(unittest.TestCase):
         # TODO make this controlled by verbosity maybe?
         print_stderr(compilation_result)
 
-        # compile other_file
-        gcc_build_obj(other_file)
-
-        # link both object files and run resulting executable
-        source_files = [file_under_test.with_suffix(".o"), other_file.with_suffix(".o")]
-        options = []
+        # compile other_file with gcc, link it with file_under_test's object file, and run
+        # the resulting executable; doing this in one gcc invocation saves a process spawn.
+        # -fstack-protector-all only affects other_file since the other input is already
+        # compiled.
+        # IMPORTANT: if 'gcc' command actually points to clang, which it does on macOS,
+        # we must _not_ enable optimizations here.
+        # Clang optimizes out sign-/zero-extension for narrow args
+        # which violates the System V ABI and breaks ABI compatibility
+        # with our implementation
+        # see https://stackoverflow.com/a/36760539
+        source_files = [file_under_test.with_suffix(".o"), other_file]
+        options = ["-fstack-protector-all"]
         if needs_mathlib(file_under_test) or needs_mathlib(other_file):
             options.append("-lm")
         result = gcc_compile_and_run(source_files, options)
@@ -472,6 +720,25 @@ class ExtraCredit(Flag):
     ALL = BITWISE | COMPOUND | INCREMENT | GOTO | SWITCH | NAN | UNION
 
 
+# map feature names used in test_properties.json (e.g. "bitwise") to flags
+_FEATURE_TO_FLAG: dict[str, ExtraCredit] = {
+    name.lower(): flag
+    for name, flag in ExtraCredit.__members__.items()
+    if flag not in (ExtraCredit.NONE, ExtraCredit.ALL)
+}
+
+# map each extra-credit test program to the set of extra credit features it requires
+# (converted from the list of feature names in test_properties.json)
+_EXTRA_CREDIT_FLAGS: dict[str, ExtraCredit] = {
+    key: functools.reduce(
+        operator.or_,
+        (_FEATURE_TO_FLAG[feature] for feature in features),
+        ExtraCredit.NONE,
+    )
+    for key, features in EXTRA_CREDIT_PROGRAMS.items()
+}
+
+
 def excluded_extra_credit(source_prog: Path, extra_credit_flags: ExtraCredit) -> bool:
     """Based on our current extra credit settings, should we include this test program?
 
@@ -487,17 +754,11 @@ def excluded_extra_credit(source_prog: Path, extra_credit_flags: ExtraCredit) ->
         # this isn't an extra-credit test so we shouldn't exclude it
         return False
 
-    # convert list of strings representing required extra credit features for this program
-    # to list of ExtraCredit flags
-    key = get_props_key(source_prog)
-
-    features_required = (
-        ExtraCredit[str.upper(feature)] for feature in EXTRA_CREDIT_PROGRAMS[key]
-    )
+    features_required = _EXTRA_CREDIT_FLAGS[get_props_key(source_prog)]
 
     # exclude this test if it requires any extra credit features that
     # aren't included in this test run
-    return any(f not in extra_credit_flags for f in features_required)
+    return bool(features_required & ~extra_credit_flags)
 
 
 def make_invalid_test(program: Path) -> Callable[[TestChapter], None]:
@@ -557,7 +818,7 @@ def make_test_lib(program: Path) -> Callable[[TestChapter], None]:
 
 def make_invalid_tests(
     test_dir: Path, stage: str, extra_credit_flags: ExtraCredit
-) -> list[tuple[str, Callable[[TestChapter], None]]]:
+) -> list[tuple[str, Callable[[TestChapter], None], Path]]:
     """Generate one test method for each invalid test program in test_dir.
 
     We use extra_credit_flags and stage to discover invalid test cases within test_dir.
@@ -571,13 +832,13 @@ def make_invalid_tests(
         extra_credit_flags: extra credit features to test (specified on the command line)
 
     Returns:
-        A list of (name, test method) tuples, intended to be included on a dynamically generated
-        subclass of TestChapter
+        A list of (name, test method, test program) tuples. The test methods are intended
+        to be included on a dynamically generated subclass of TestChapter
     """
-    tests: list[tuple[str, Callable[[TestChapter], None]]] = []
+    tests: list[tuple[str, Callable[[TestChapter], None], Path]] = []
     for invalid_subdir in DIRECTORIES_BY_STAGE[stage]["invalid"]:
         invalid_test_dir = test_dir / invalid_subdir
-        for program in invalid_test_dir.rglob("*.c"):
+        for program in list_c_files(invalid_test_dir):
             if excluded_extra_credit(program, extra_credit_flags):
                 continue
 
@@ -588,7 +849,7 @@ def make_invalid_tests(
             test_name = f"test_{key}"
 
             test_method = make_invalid_test(program)
-            tests.append((test_name, test_method))
+            tests.append((test_name, test_method, program))
 
     return tests
 
@@ -617,7 +878,7 @@ def make_valid_tests(
     tests: list[tuple[str, Callable[[TestChapter], None]]] = []
     for valid_subdir in DIRECTORIES_BY_STAGE[stage]["valid"]:
         valid_testdir = test_dir / valid_subdir
-        for program in valid_testdir.rglob("*.c"):
+        for program in list_c_files(valid_testdir):
             if excluded_extra_credit(program, extra_credit_flags):
                 # this requires extra credit features that aren't enabled
                 continue
@@ -652,6 +913,8 @@ def build_test_class(
     stage: str,
     extra_credit_flags: ExtraCredit,
     skip_invalid: bool,
+    batch_invalid: bool = False,
+    use_result_cache: bool = False,
 ) -> Type[unittest.TestCase]:
     """Construct the test class for a normal (non-optimization) chapter.
 
@@ -666,10 +929,14 @@ def build_test_class(
         stage: only compile programs up through this stage
         extra_credit_flags: extra credit features to test, represented as a bit vector
         skip_invalid: true if we should skip invalid test programs
+        batch_invalid: true if we should compile all invalid test programs up front
+                       (see TestChapter.setUpClass)
+        use_result_cache: true if we should skip tests that passed in an earlier run
+                          (see TestChapter.use_result_cache)
     """
 
     # base directory with all of this chapter's test programs
-    test_dir = TEST_DIR.joinpath(f"chapter_{chapter}").resolve()
+    test_dir = _TEST_DIR_RESOLVED / f"chapter_{chapter}"
 
     testclass_name = f"TestChapter{chapter}"
 
@@ -679,14 +946,20 @@ def build_test_class(
         "cc": compiler,
         "options": options,
         "exit_stage": None if stage == "run" else stage,
+        "use_result_cache": use_result_cache,
     }
 
     # generate tests for invalid test programs and add them to testclass_attrs
     if not skip_invalid:
         invalid_tests = make_invalid_tests(test_dir, stage, extra_credit_flags)
         # test_name is the method name
-        for test_name, test_cls in invalid_tests:
+        for test_name, test_cls, _ in invalid_tests:
             testclass_attrs[test_name] = test_cls
+        if batch_invalid:
+            # batch up exactly the programs we just generated tests for
+            testclass_attrs["batched_invalid_programs"] = [
+                prog for _, _, prog in invalid_tests
+            ]
 
     # generate tests for valid test programs
     valid_tests = make_valid_tests(test_dir, stage, extra_credit_flags)
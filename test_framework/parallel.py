@@ -0,0 +1,135 @@
+"""Run a test suite across several worker processes"""
+from __future__ import annotations
+
+import multiprocessing
+import sys
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, TextIO, Tuple
+
+# Shards of the test suite, one per worker process.
+# Workers are forked after this is set, so they inherit it (along with the dynamically
+# generated test classes) instead of having to pickle test cases.
+_SHARDS: List[List[unittest.TestCase]] = []
+
+
+class ShardResult(NamedTuple):
+    """Picklable summary of the unittest.TestResult for one shard"""
+
+    tests_run: int
+    # (test description, formatted traceback) pairs
+    failures: List[Tuple[str, str]]
+    errors: List[Tuple[str, str]]
+    skipped: int
+    expected_failures: int
+    unexpected_successes: int
+
+
+def iter_tests(suite: unittest.TestSuite) -> Iterator[unittest.TestCase]:
+    """Flatten a (possibly nested) test suite into individual test cases"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def shard_tests(suite: unittest.TestSuite, jobs: int) -> List[List[unittest.TestCase]]:
+    """Split suite into at most jobs shards, dealing tests out round-robin.
+
+    Each test only writes (and cleans up) output files named after its own test program,
+    so tests can run concurrently with any other tests, including ones in the same
+    directory.
+    """
+    tests = list(iter_tests(suite))
+    jobs = min(jobs, len(tests))
+    return [tests[i::jobs] for i in range(jobs)]
+
+
+def run_shard(index: int, failfast: bool) -> ShardResult:
+    """Run one shard of the test suite (in a worker process) and summarize the results"""
+    result = unittest.TestResult()
+    result.failfast = failfast
+    # let Ctrl-C stop this worker cleanly
+    unittest.registerResult(result)
+    unittest.TestSuite(_SHARDS[index]).run(result)
+    return ShardResult(
+        tests_run=result.testsRun,
+        failures=[(str(test), traceback) for test, traceback in result.failures],
+        errors=[(str(test), traceback) for test, traceback in result.errors],
+        skipped=len(result.skipped),
+        expected_failures=len(result.expectedFailures),
+        unexpected_successes=len(result.unexpectedSuccesses),
+    )
+
+
+def run_in_parallel(
+    suite: unittest.TestSuite,
+    jobs: int,
+    *,
+    failfast: bool,
+    stream: TextIO = sys.stderr,
+) -> bool:
+    """Run suite across up to jobs worker processes and report results like TextTestRunner.
+
+    Returns:
+        True if every test passed, False otherwise
+    """
+    _SHARDS[:] = shard_tests(suite, jobs)
+    start_time = time.perf_counter()
+    if _SHARDS:
+        with ProcessPoolExecutor(
+            max_workers=len(_SHARDS), mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            results = list(
+                executor.map(run_shard, range(len(_SHARDS)), [failfast] * len(_SHARDS))
+            )
+    else:
+        results = []
+    time_taken = time.perf_counter() - start_time
+
+    # print failures and summary in the same format as unittest.TextTestRunner
+    # (the test script's own tests parse this output)
+    stream.write("\n")
+    for flavour, failed_tests in [
+        ("ERROR", [e for r in results for e in r.errors]),
+        ("FAIL", [f for r in results for f in r.failures]),
+    ]:
+        for description, traceback in failed_tests:
+            stream.write("=" * 70 + "\n")
+            stream.write(f"{flavour}: {description}\n")
+            stream.write("-" * 70 + "\n")
+            stream.write(f"{traceback}\n")
+
+    tests_run = sum(r.tests_run for r in results)
+    failures = sum(len(r.failures) for r in results)
+    errors = sum(len(r.errors) for r in results)
+    skipped = sum(r.skipped for r in results)
+    expected_failures = sum(r.expected_failures for r in results)
+    unexpected_successes = sum(r.unexpected_successes for r in results)
+
+    stream.write("-" * 70 + "\n")
+    stream.write(
+        f"Ran {tests_run} test{'' if tests_run == 1 else 's'} in {time_taken:.3f}s\n\n"
+    )
+
+    infos = []
+    successful = not (failures or errors or unexpected_successes)
+    if failures:
+        infos.append(f"failures={failures}")
+    if errors:
+        infos.append(f"errors={errors}")
+    if skipped:
+        infos.append(f"skipped={skipped}")
+    if expected_failures:
+        infos.append(f"expected failures={expected_failures}")
+    if unexpected_successes:
+        infos.append(f"unexpected successes={unexpected_successes}")
+
+    stream.write("OK" if successful else "FAILED")
+    if infos:
+        stream.write(f" ({', '.join(infos)})")
+    stream.write("\n")
+    stream.flush()
+    return successful
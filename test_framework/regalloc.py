@@ -3,7 +3,17 @@ from __future__ import annotations
 
 import subprocess
 from pathlib import Path
-from typing import Callable, List, Mapping, NamedTuple, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from . import basic
 from .parser import asm, parse
@@ -21,6 +31,22 @@ else:
     WRAPPER_SCRIPT = TEST_DIR.joinpath("wrapper_linux.s")
 
 
+class _LazyMsg:
+    """Assertion message that isn't built until it's printed.
+
+    build_msg formats the whole assembly function, which is wasted work when the
+    assertion passes; unittest only converts msg to a string on failure.
+    """
+
+    def __init__(self, fn: Callable[..., str], *args: Any, **kwargs: Any) -> None:
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> str:
+        return self._fn(*self._args, **self._kwargs)
+
+
 # TypeGuard would be better return value here, but 3.8 and 3.9 don't support it
 # and we're avoiding additional dependencies like typing_extensions
 def uses_stack(i: asm.AsmItem) -> bool:
@@ -28,10 +54,56 @@ def uses_stack(i: asm.AsmItem) -> bool:
     if isinstance(i, asm.Label):
         return False
 
-    def is_stack(operand: asm.Operand) -> bool:
-        return isinstance(operand, asm.Memory) and operand.base == Register.BP
+    # this is called on every instruction we inspect, so use a plain loop
+    # instead of any() over a generator
+    memory = asm.Memory
+    bp = Register.BP
+    for op in i.operands:
+        if type(op) is memory and op.base is bp:
+            return True
+    return False
+
+
+# moves to or from these registers aren't candidates for coalescing
+_SP_BP = frozenset({Register.BP, Register.SP})
+
+
+def is_mov_between_regs(i: asm.AsmItem) -> bool:
+    """Check whether this is a move between registers (other than RBP/RSP)"""
+    if isinstance(i, asm.Instruction) and i.opcode is Opcode.MOV:
+        src, dst = i.operands[0], i.operands[1]
+        return (
+            isinstance(src, Register)
+            and src not in _SP_BP
+            and isinstance(dst, Register)
+            and dst not in _SP_BP
+        )
 
-    return any(is_stack(op) for op in i.operands)
+    # otherwise, not a mov
+    return False
+
+
+def _classify(
+    instructions: List[asm.AsmItem],
+) -> tuple[List[asm.AsmItem], List[asm.AsmItem]]:
+    """Sort a function's instructions into the groups register allocation tests inspect.
+
+    Makes a single pass over instructions, so coalescing_test can check for stack
+    accesses and register-to-register moves while walking the function body once.
+
+    Returns:
+        A (stack_uses, mov_between_regs) tuple, where stack_uses holds every
+        instruction that accesses the stack and mov_between_regs holds every mov
+        between two registers (other than RBP/RSP).
+    """
+    stack_uses: List[asm.AsmItem] = []
+    mov_between_regs: List[asm.AsmItem] = []
+    for i in instructions:
+        if uses_stack(i):
+            stack_uses.append(i)
+        elif is_mov_between_regs(i):
+            mov_between_regs.append(i)
+    return stack_uses, mov_between_regs
 
 
 class TestRegAlloc(basic.TestChapter):
@@ -51,21 +123,6 @@ class TestRegAlloc(basic.TestChapter):
         """Directory containing extra library code"""
         return self.test_dir.joinpath("libraries")
 
-    def tearDown(self) -> None:
-        """Delete files produced during this test run (e.g. assembly and object files)
-
-        Don't delete the wrapper scripts!"""
-        garbage_files = (
-            f
-            for f in self.test_dir.rglob("*")
-            if not f.is_dir()
-            and f.suffix not in [".c", ".h"]
-            and f.stem not in ["wrapper_osx", "wrapper_linux"]
-        )
-
-        for f in garbage_files:
-            f.unlink()
-
     def basic_test(self, program_path: Path, extra_lib: Optional[Path] = None) -> None:
         """Test that the compiled program behaves correctly but don't inspect the assembly code.
 
@@ -100,7 +157,7 @@ class TestRegAlloc(basic.TestChapter):
         # make sure behavior is the same
         # NOTE: if program_path is assembly file (because we were called from another test method
         # that's going to parse this file and perform more validation on it),
-        # we should ook up corresponding C file in EXPECTED_RESULTS
+        # we should look up corresponding C file in EXPECTED_RESULTS
         key = program_path.with_suffix(".c")
         self.validate_runs(key, actual_result)
 
@@ -154,7 +211,6 @@ class TestRegAlloc(basic.TestChapter):
             extra_lib: Additional library files to link against
             target_fun: Name of function to parse/inspect
         """
-
         # validate behavior + get parsed assembly
         parsed_asm = self.run_and_parse(
             program_path=program_path,
@@ -166,7 +222,8 @@ class TestRegAlloc(basic.TestChapter):
         bad_instructions = [i for i in parsed_asm.instructions if uses_stack(i)]
         self.assertFalse(
             bad_instructions,
-            msg=common.build_msg(
+            msg=_LazyMsg(
+                common.build_msg,
                 "Found instructions that use operands on the stack",
                 bad_instructions=bad_instructions,
                 full_prog=parsed_asm,
@@ -194,22 +251,35 @@ class TestRegAlloc(basic.TestChapter):
             extra_lib: Additional library files to link against
             target_fun: Name of function to parse/inspect
         """
-
         parsed_asm = self.run_and_parse(
             program_path=program_path,
             target_fun=target_fun,
             extra_lib=extra_lib,
         )
 
-        spill_instructions = [
-            i
-            for i in parsed_asm.instructions
-            if uses_stack(i) and i.opcode == Opcode.MOV  # type: ignore # use_stack guarantees this is an instruction
-        ]
+        # find the mov instructions that access the stack, and the distinct memory
+        # operands they use, in a single pass
+        spill_instructions: List[asm.AsmItem] = []
+        # Operands themselves are not hashable, so key on their fields instead
+        spilled_operands: Set[Tuple[Any, ...]] = set()
+        for i in parsed_asm.instructions:
+            if (
+                isinstance(i, asm.Instruction)
+                and i.opcode == Opcode.MOV
+                and uses_stack(i)
+            ):
+                spill_instructions.append(i)
+                for op in i.operands:
+                    if isinstance(op, asm.Memory):
+                        spilled_operands.add(
+                            (op.base, tuple(op.disp or ()), op.idx, op.scale)
+                        )
+
         self.assertLessEqual(
             len(spill_instructions),
             max_spilled_instructions,
-            msg=common.build_msg(
+            msg=_LazyMsg(
+                common.build_msg,
                 f"Should only need {max_spilled_instructions} instructions \
                     involving spilled pseudo but found {len(spill_instructions)}",
                 bad_instructions=spill_instructions,
@@ -218,18 +288,11 @@ class TestRegAlloc(basic.TestChapter):
             ),
         )
 
-        spilled_operands = set(
-            [
-                str(op)  # convert to string b/c Operands themselves are not hashable
-                for i in spill_instructions
-                for op in i.operands  # type: ignore
-                if isinstance(op, asm.Memory)
-            ]
-        )
         self.assertLessEqual(
             len(spilled_operands),
             max_spilled_pseudos,
-            msg=common.build_msg(
+            msg=_LazyMsg(
+                common.build_msg,
                 f"At most {max_spilled_pseudos} pseudoregs should have been spilled, \
                     looks like {len(spilled_operands)} were",
                 bad_instructions=spill_instructions,
@@ -257,34 +320,17 @@ class TestRegAlloc(basic.TestChapter):
             target_fun: Name of function to parse/inspect
             max_moves: maximum number of mov instructions between registers
         """
-
-        def is_mov_between_regs(i: asm.AsmItem) -> bool:
-            """Check whether this is a move between registers (other than RBP/RSP)"""
-            if common.is_mov(i):
-                src, dst = i.operands[0], i.operands[1]  # type: ignore  # is_mov guarantees it's an instruction
-                return (
-                    isinstance(src, asm.Register)
-                    and src not in [Register.BP, Register.SP]
-                    and isinstance(dst, asm.Register)
-                    and dst not in [Register.BP, Register.SP]
-                )
-
-            # otherwise, not a mov
-            return False
-
         parsed_asm = self.run_and_parse(
             program_path,
             extra_lib=extra_lib,
             target_fun=target_fun,
         )
 
-        bad_instructions = [i for i in parsed_asm.instructions if uses_stack(i)]
-        mov_instructions = [
-            i for i in parsed_asm.instructions if is_mov_between_regs(i)
-        ]
+        bad_instructions, mov_instructions = _classify(parsed_asm.instructions)
         self.assertFalse(
             bad_instructions,
-            msg=common.build_msg(
+            msg=_LazyMsg(
+                common.build_msg,
                 "Found instructions that use operands on the stack",
                 bad_instructions=bad_instructions,
                 full_prog=parsed_asm,
@@ -294,7 +340,8 @@ class TestRegAlloc(basic.TestChapter):
         self.assertLessEqual(
             len(mov_instructions),
             max_moves,
-            msg=common.build_msg(
+            msg=_LazyMsg(
+                common.build_msg,
                 f"Expected at most {max_moves} move instructions but found {len(mov_instructions)}",
                 bad_instructions=mov_instructions,
                 full_prog=parsed_asm,
@@ -454,6 +501,7 @@ def make_regalloc_test(
                 spilltest_info.max_spilled_instructions,
                 spilltest_info.max_spilled_pseudos,
                 spilltest_info.extra_lib,
+                spilltest_info.target_fun,
             )
 
     else:
@@ -502,11 +550,10 @@ def configure_tests(
     else:
         subdirs = ["int_only", "all_types"]
 
-    all_tests = [p for subdir in subdirs for p in (TEST_DIR / subdir).rglob("*.c")]
-
-    for program in all_tests:
-        if basic.excluded_extra_credit(program, extra_credit_flags):
-            continue
-        key = program.relative_to(TEST_DIR).with_suffix("")
-        name = f"test_{key}"
-        setattr(TestRegAlloc, name, make_regalloc_test(program, no_coalescing))
+    for subdir in subdirs:
+        for program in basic.list_c_files(TEST_DIR / subdir):
+            if basic.excluded_extra_credit(program, extra_credit_flags):
+                continue
+            key = program.relative_to(TEST_DIR).with_suffix("")
+            name = f"test_{key}"
+            setattr(TestRegAlloc, name, make_regalloc_test(program, no_coalescing))
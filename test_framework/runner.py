@@ -13,6 +13,7 @@ from pathlib import Path
 from typing import Iterable, Optional, List, Type
 
 import test_framework
+import test_framework.parallel
 import test_framework.regalloc
 import test_framework.tacky.suite
 from test_framework.basic import ExtraCredit
@@ -109,6 +110,32 @@ def parse_arguments() -> argparse.Namespace:
         "--failfast", "-f", action="store_true", help="Stop on first test failure"
     )
     parser.add_argument("--verbose", "-v", action="count", default=0)
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Run tests in this many parallel processes",
+    )
+    parser.add_argument(
+        "--batch-invalid",
+        action="store_true",
+        help=(
+            "Compile each chapter's invalid test programs up front, "
+            "running several instances of the compiler at once"
+        ),
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=(
+            "Skip Part I & II tests that already passed with the same compiler "
+            "executable, options, and test program. "
+            "(If your compiler is a wrapper script, rebuilding the real compiler "
+            "won't invalidate the cache!) "
+            "Cached results that haven't been used for a week are deleted."
+        ),
+    )
     parser.add_argument(
         "--stage", type=str, choices=["lex", "parse", "validate", "tacky", "codegen"]
     )
@@ -216,6 +243,15 @@ def parse_arguments() -> argparse.Namespace:
     elif not (args.cc and args.chapter):
         parser.error("cc and --chapter are required")
 
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if args.verbose and args.jobs > 1:
+        parser.error("--verbose can't be combined with --jobs")
+
+    if args.batch_invalid and args.jobs > 1:
+        parser.error("--batch-invalid can't be combined with --jobs")
+
     if args.stage and args.chapter >= TACKY_OPT_CHAPTER:
         # TODO better error message here
         parser.error(
@@ -396,6 +432,9 @@ def main() -> int:
     # https://eli.thegreenplace.net/2014/04/02/dynamically-generating-python-test-cases
     test_suite = unittest.TestSuite()
 
+    if args.cache:
+        test_framework.basic.prune_result_cache()
+
     for chapter in chapters:
         test_class: Type[unittest.TestCase]
         if chapter < TACKY_OPT_CHAPTER:
@@ -407,6 +446,8 @@ def main() -> int:
                 stage=stage,
                 extra_credit_flags=extra_credit,
                 skip_invalid=args.skip_invalid,
+                batch_invalid=args.batch_invalid,
+                use_result_cache=args.cache,
             )
             test_instance = unittest.defaultTestLoader.loadTestsFromTestCase(test_class)
             test_suite.addTest(test_instance)
@@ -438,8 +479,13 @@ def main() -> int:
     unittest.installHandler()
 
     # run it
-    runner = unittest.TextTestRunner(verbosity=args.verbose, failfast=args.failfast)
-    result = runner.run(test_suite)
-    if result.wasSuccessful():
+    if args.jobs > 1:
+        successful = test_framework.parallel.run_in_parallel(
+            test_suite, args.jobs, failfast=args.failfast
+        )
+    else:
+        runner = unittest.TextTestRunner(verbosity=args.verbose, failfast=args.failfast)
+        successful = runner.run(test_suite).wasSuccessful()
+    if successful:
         return 0
     return 1
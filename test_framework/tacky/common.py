@@ -197,7 +197,7 @@ def is_ret(i: asm.AsmItem) -> bool:
 
 
 def is_mov(i: asm.AsmItem) -> bool:
-    return isinstance(i, asm.Instruction) and i.opcode == Opcode.MOV
+    return isinstance(i, asm.Instruction) and i.opcode is Opcode.MOV
 
 
 def is_zero_instr(i: asm.AsmItem) -> bool:
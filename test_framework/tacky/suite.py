@@ -55,11 +55,11 @@ def configure_tests(
     tests: Iterable[Path]
     if cls == unreachable.TestUnreachableCodeElim:
         # no distinction b/t int_only and all_types
-        tests = cls.test_dir.rglob("*.c")
+        tests = basic.list_c_files(cls.test_dir)
     else:
-        tests = (cls.test_dir / "int_only").rglob("*.c")
+        tests = basic.list_c_files(cls.test_dir / "int_only")
         if not int_only:
-            partii_tests = (cls.test_dir / "all_types").rglob("*.c")
+            partii_tests = basic.list_c_files(cls.test_dir / "all_types")
             tests = itertools.chain(tests, partii_tests)
 
     for program in tests:
@@ -1,6 +1,7 @@
 """Make sure all valid test programs are well-defined and expected_results.json is up to date"""
 
 import itertools
+import os
 import subprocess
 import unittest
 from pathlib import Path
@@ -118,14 +119,9 @@ class SanitizerTest(unittest.TestCase):
 
     def tearDown(self) -> None:
         """Delete executable files produced during this test run"""
-        garbage_files = (
-            f
-            for f in basic.TEST_DIR.rglob("*")
-            if not f.is_dir() and f.suffix not in [".c", ".h", ".s"]
-        )
-
-        for junk in garbage_files:
-            junk.unlink()
+        for entry in basic.walk_files(basic.TEST_DIR):
+            if os.path.splitext(entry.name)[1] not in (".c", ".h", ".s"):
+                os.unlink(entry.path)
 
 
 def make_sanitize_test(program: Path) -> Callable[[SanitizerTest], None]:
@@ -6,55 +6,75 @@ These assume we have access to two copies of the reference implementation:
 """
 from __future__ import annotations
 
+import os
 import re
+import shlex
 import shutil
 import subprocess
 import tempfile
 import unittest
 from pathlib import Path
-from typing import Union
+from typing import Mapping, Optional, Union
 
 from ..regalloc import REGALLOC_TESTS
-from ..basic import EXPECTED_RESULTS, ROOT_DIR, TEST_DIR
+from ..basic import EXPECTED_RESULTS, ROOT_DIR, TEST_DIR, count_c_files, list_c_files
 from ..tacky.dead_store_elim import STORE_ELIMINATED
 
 TEST_PATTERN = re.compile("^Ran ([0-9]+) tests", flags=re.MULTILINE)
 FAILURE_PATTERN = re.compile("failures=([0-9]+)")
 
 
-def run_test_script(cmd: str) -> subprocess.CompletedProcess[str]:
+def run_test_script(
+    cmd: str, env: Optional[Mapping[str, str]] = None
+) -> subprocess.CompletedProcess[str]:
+    # expand environment variables ourselves rather than spawning a shell to do it
+    argv = [os.path.expandvars(tok) for tok in shlex.split(cmd)]
     return subprocess.run(
-        cmd,
-        shell=True,
+        argv,
         check=True,
         capture_output=True,
         text=True,
         cwd=str(ROOT_DIR),
+        env=env,
     )
 
 
+def parse_count(output: str, prefix: str, pattern: re.Pattern[str]) -> int:
+    """Parse the number immediately following prefix in unittest's output.
+
+    Plain substring search is much cheaper than a regex search over a long stderr;
+    fall back to pattern if the prefix isn't found.
+    """
+    start = output.find(prefix)
+    if start != -1:
+        start += len(prefix)
+        end = start
+        while end < len(output) and output[end].isdigit():
+            end += 1
+        if end > start:
+            return int(output[start:end])
+
+    match = pattern.search(output)
+    if not match:
+        raise RuntimeError(f"Unexpected test output: {output}")
+
+    return int(match.group(1))
+
+
 def get_test_count(
     testrun: Union[subprocess.CalledProcessError, subprocess.CompletedProcess[str]]
 ) -> int:
-    run_output = re.search(TEST_PATTERN, testrun.stderr)
-    if not run_output:
-        raise RuntimeError(f"Unexpected test output: {testrun.stderr}")
-
-    return int(run_output.group(1))
+    return parse_count(testrun.stderr, "\nRan ", TEST_PATTERN)
 
 
 def get_failure_count(failure: subprocess.CalledProcessError) -> int:
-    fail_output = re.search(FAILURE_PATTERN, failure.stderr)
-    if not fail_output:
-        raise RuntimeError(f"Unexpected test output: {failure.stderr}")
-
-    return int(fail_output.group(1))
+    return parse_count(failure.stderr, "failures=", FAILURE_PATTERN)
 
 
 class TopLevelTest(unittest.TestCase):
     def test_one_chapter(self) -> None:
         """We can run tests for a single chapter with --latest-only"""
-        expected_test_count = len(list((TEST_DIR / "chapter_2").rglob("*.c")))
+        expected_test_count = count_c_files(TEST_DIR / "chapter_2")
         try:
             testrun = run_test_script("./test_compiler $NQCC --chapter 2 --latest-only")
         except subprocess.CalledProcessError as err:
@@ -65,8 +85,8 @@ class TopLevelTest(unittest.TestCase):
 
     def test_multiple_chapters_intermediate(self) -> None:
         """We can test through an intermediate stage through multiple chapters"""
-        expected_test_count = len(list((TEST_DIR / "chapter_1").rglob("*.c"))) + len(
-            list((TEST_DIR / "chapter_2").rglob("*.c"))
+        expected_test_count = count_c_files(TEST_DIR / "chapter_1") + count_c_files(
+            TEST_DIR / "chapter_2"
         )
         try:
             testrun = run_test_script("./test_compiler $NQCC --chapter 2 --stage parse")
@@ -78,9 +98,9 @@ class TopLevelTest(unittest.TestCase):
 
     def test_regalloc_failure(self) -> None:
         """Partially-completed NQCC fails register allocation tests"""
-        expected_test_count = len(
-            list((TEST_DIR / "chapter_20/int_only").rglob("*.c"))
-        ) + len(list((TEST_DIR / "chapter_20/all_types").rglob("*.c")))
+        expected_test_count = count_c_files(
+            TEST_DIR / "chapter_20/int_only"
+        ) + count_c_files(TEST_DIR / "chapter_20/all_types")
         expected_failure_count = len(REGALLOC_TESTS.keys())
         with self.assertRaises(subprocess.CalledProcessError) as err:
             run_test_script("./test_compiler $NQCC_PARTIAL --chapter 20 --latest-only")
@@ -95,7 +115,7 @@ class TopLevelTest(unittest.TestCase):
 
     def test_optimization_success(self) -> None:
         """With optimizations, NQCC passes the chapter 19 tests"""
-        expected_test_count = len(list((TEST_DIR / "chapter_19").rglob("*.c")))
+        expected_test_count = count_c_files(TEST_DIR / "chapter_19")
         try:
             testrun = run_test_script(
                 "./test_compiler $NQCC --chapter 19 --latest-only"
@@ -171,7 +191,7 @@ class BadSourceTest(unittest.TestCase):
     def test_bad_retval(self) -> None:
         """Make sure the test fails if retval is different than expected"""
 
-        expected_test_count = len(list((TEST_DIR / "chapter_1").rglob("*.c")))
+        expected_test_count = count_c_files(TEST_DIR / "chapter_1")
         with self.assertRaises(subprocess.CalledProcessError) as cpe:
             run_test_script("./test_compiler $NQCC --chapter 1")
         actual_test_count = get_test_count(cpe.exception)
@@ -182,8 +202,10 @@ class BadSourceTest(unittest.TestCase):
     def test_bad_stdout(self) -> None:
         """Make sure test fails if stdout is different than expected"""
 
-        expected_test_count = len(list((TEST_DIR / "chapter_9").rglob("*.c"))) - len(
-            list((TEST_DIR / "chapter_9").rglob("**/extra_credit/*.c"))
+        expected_test_count = sum(
+            1
+            for p in list_c_files(TEST_DIR / "chapter_9")
+            if "extra_credit" not in p.parts
         )
         with self.assertRaises(subprocess.CalledProcessError) as cpe:
             run_test_script("./test_compiler $NQCC --chapter 9 --latest-only")
@@ -192,10 +214,41 @@ class BadSourceTest(unittest.TestCase):
         self.assertEqual(actual_test_count, expected_test_count)
         self.assertEqual(1, failure_count)
 
+    def test_parallel(self) -> None:
+        """Running tests in parallel finds the same failures as running them serially"""
+        with self.assertRaises(subprocess.CalledProcessError) as serial:
+            run_test_script("./test_compiler $NQCC --chapter 9 --latest-only")
+        with self.assertRaises(subprocess.CalledProcessError) as parallel:
+            run_test_script("./test_compiler $NQCC --chapter 9 --latest-only -j 2")
+        self.assertEqual(
+            get_test_count(serial.exception), get_test_count(parallel.exception)
+        )
+        self.assertEqual(
+            get_failure_count(serial.exception), get_failure_count(parallel.exception)
+        )
+
+    def test_cache(self) -> None:
+        """Rerunning with --cache skips passing tests but still reports failures"""
+        # start from an empty cache, and don't leave one behind in the checkout
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = {**os.environ, "TEST_CACHE_DIR": cache_dir}
+            cmd = "./test_compiler $NQCC --chapter 1 --cache"
+            with self.assertRaises(subprocess.CalledProcessError) as first:
+                run_test_script(cmd, env=env)
+            with self.assertRaises(subprocess.CalledProcessError) as second:
+                run_test_script(cmd, env=env)
+        self.assertIn("skipped=", second.exception.stderr)
+        self.assertEqual(
+            get_test_count(first.exception), get_test_count(second.exception)
+        )
+        self.assertEqual(
+            get_failure_count(first.exception), get_failure_count(second.exception)
+        )
+
     def test_optimization_failure(self) -> None:
         """Test fails if code hasn't been optimized as expected"""
-        expected_test_count = len(
-            list((TEST_DIR / "chapter_19/dead_store_elimination").rglob("*.c"))
+        expected_test_count = count_c_files(
+            TEST_DIR / "chapter_19/dead_store_elimination"
         )
 
         with self.assertRaises(subprocess.CalledProcessError) as err:
@@ -213,7 +266,7 @@ class BadSourceTest(unittest.TestCase):
 
     def test_intermediate(self) -> None:
         """Changed code shouldn't impact intermediate stages"""
-        expected_test_count = len(list((TEST_DIR / "chapter_1").rglob("*.c")))
+        expected_test_count = count_c_files(TEST_DIR / "chapter_1")
         try:
             testrun = run_test_script("./test_compiler $NQCC --chapter 1 --stage parse")
         except subprocess.CalledProcessError as err: